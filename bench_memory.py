@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+メモリベンチマーク - 大量論文取得時のメモリ使用量を旧Paper表現と比較
+
+使い方:
+    python bench_memory.py              # 10,000件 × キーワード5個で比較
+    python bench_memory.py -n 20000 -k 10
+
+各モードは別プロセスで実行し、tracemalloc で以下を計測する。
+    保持: APIレスポンスを解放した後もセクションが保持しているメモリ
+    ピーク: セクション構築中の増分（APIレスポンス分を除く）
+参考としてプロセスのピークRSS（ru_maxrss）も出力する。
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import gc
+import resource
+import tracemalloc
+import subprocess
+from datetime import datetime
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import List, Optional
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 依存ライブラリの読み込み分は両モード共通でベースラインに含める
+import main as bot
+
+MB = 1024 * 1024
+
+KEYWORDS = ["RAG", "Agent", "Memory", "Diffusion", "Reasoning", "Vision", "Robot", "Speech", "Graph", "Code"]
+
+
+@dataclass
+class LegacyPaper:
+    """変更前のPaper表現（__dict__あり、著者はリスト）"""
+    title: str
+    authors: List[str]
+    summary: str
+    published: datetime
+    url: str
+    pdf_url: str
+    arxiv_id: str
+    citation_count: int = 0
+    ai_summary: Optional[str] = None
+
+
+def build_payload(n: int, keywords: List[str]) -> str:
+    """Hugging Face Daily Papers API相当のJSONを生成"""
+    rng = random.Random(0)
+    author_pool = [f"Author {i:05d}" for i in range(max(n // 5, 1))]
+    filler = "We propose a method that improves large models on many benchmarks. " * 15
+    items = []
+    for i in range(n):
+        picked = rng.sample(keywords, k=min(2, len(keywords)))
+        items.append({
+            "paper": {
+                "id": f"2601.{i:05d}",
+                "title": f"Paper {i} on {' and '.join(picked)}",
+                "authors": [{"name": rng.choice(author_pool)} for _ in range(rng.randint(3, 12))],
+                "summary": f"{' '.join(picked)}. {filler}",
+                "publishedAt": "2026-01-01T00:00:00.000Z",
+                "upvotes": rng.randint(0, 500),
+                "ai_summary": None,
+            }
+        })
+    return json.dumps(items)
+
+
+def build_legacy(data: List[dict], keywords: List[str]) -> list:
+    """変更前の処理: キーワードごとに全件を走査してPaperを再生成"""
+    sections = []
+    for keyword in [None] + keywords:
+        papers = []
+        for item in data:
+            paper_data = item.get("paper", item)
+            paper_id = paper_data.get("id", "")
+            if keyword:
+                title = paper_data.get("title", "").lower()
+                summary = paper_data.get("summary", "").lower()
+                if keyword.lower() not in title and keyword.lower() not in summary:
+                    continue
+            papers.append(LegacyPaper(
+                title=paper_data.get("title", ""),
+                # 実際のAPIでは毎回新しい文字列になるためコピーして再現
+                authors=["".join(a.get("name", "")) for a in paper_data.get("authors", [])],
+                summary="".join(paper_data.get("summary", "")),
+                published=datetime.fromisoformat(paper_data.get("publishedAt", "").replace("Z", "+00:00")),
+                url=f"https://huggingface.co/papers/{paper_id}",
+                pdf_url=f"https://arxiv.org/pdf/{paper_id}.pdf",
+                arxiv_id=paper_id,
+                citation_count=paper_data.get("upvotes", 0),
+                ai_summary=paper_data.get("ai_summary"),
+            ))
+        sections.append(papers)
+    return sections
+
+
+def build_current(data: List[dict], keywords: List[str]) -> list:
+    """現在の処理: 一度だけPaperを生成し、キーワードセクションで共有"""
+    # 実際の取得処理を通すため、HTTPリクエストだけを生成済みのレスポンスに差し替える
+    # （差し替えを残すとレスポンスを参照し続けて保持メモリに含まれるため、取得後に戻す）
+    http_request = bot.http_request
+    bot.http_request = lambda *args, **kwargs: SimpleNamespace(json=lambda: data)
+    try:
+        fetcher = bot.HuggingFaceDailyFetcher(limit=len(data))
+        sections = [fetcher.fetch_papers(keyword=None)]
+    finally:
+        bot.http_request = http_request
+    return sections + [fetcher.fetch_papers(keyword=kw) for kw in keywords]
+
+
+def run_mode(mode: str, n: int, k: int) -> None:
+    """子プロセス側: 指定モードで論文を生成してメモリ使用量(バイト)を出力"""
+    keywords = KEYWORDS[:k]
+    payload = build_payload(n, keywords)
+    builder = build_legacy if mode == "legacy" else build_current
+
+    # レスポンスの文字列をPaperが参照するかどうかも計測できるよう、パース前から追跡する
+    tracemalloc.start()
+    data = json.loads(payload)
+    del payload
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+
+    sections = builder(data, keywords)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+
+    del data
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    total = sum(len(papers) for papers in sections)
+    print(json.dumps({
+        "mode": mode,
+        "retained": retained,
+        "peak": peak,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "papers": total,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paperのメモリベンチマーク")
+    parser.add_argument("-n", "--papers", type=int, default=10000, help="論文数")
+    parser.add_argument("-k", "--keywords", type=int, default=5, help="キーワード数")
+    parser.add_argument("--mode", choices=["legacy", "current"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.papers, args.keywords)
+        return
+
+    print(f"論文{args.papers}件 × キーワード{args.keywords}個")
+    results = {}
+    for mode in ("legacy", "current"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "-n", str(args.papers), "-k", str(args.keywords)],
+            check=True, capture_output=True, text=True
+        ).stdout.strip().splitlines()[-1]
+        results[mode] = json.loads(out)
+        r = results[mode]
+        print(f"{mode:>8}: 保持 {r['retained'] / MB:7.1f} MB | 構築時ピーク {r['peak'] / MB:7.1f} MB"
+              f" | ピークRSS {r['max_rss_kb'] / 1024:7.1f} MB（セクション内論文 {r['papers']}件）")
+
+    for key, label in (("retained", "保持メモリ"), ("peak", "構築時ピーク")):
+        legacy, current = results["legacy"][key], results["current"][key]
+        print(f"{label}削減: {(legacy - current) / MB:.1f} MB（{(1 - current / legacy) * 100:.1f}%）")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,15 +7,30 @@ import os
 import sys
 import json
 import logging
-from datetime import datetime, timedelta
+import argparse
+import threading
+import re
+import html
+import time
+import queue
+import zlib
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+from string import Template
+from urllib.parse import urlparse
+from typing import Callable, List, Dict, Optional, Tuple
+from dataclasses import asdict, dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import arxiv
 from dotenv import load_dotenv
 import requests
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # ロギング設定
 logging.basicConfig(
     level=logging.INFO,
@@ -26,12 +41,30 @@ logger = logging.getLogger(__name__)
 # 環境変数読み込み
 load_dotenv()
 
+# 実行期限（RUN_DEADLINE_SECONDS）に対する各ステージの予算割合
+STAGE_BUDGETS = {
+    "fetch": 0.35,
+    "enrich": 0.15,
+    "summarize": 0.35,
+    "send": 0.15,
+}
+
+
+def intern_authors(names) -> Tuple[str, ...]:
+    """著者名をintern済みのタプルに変換（同一著者の文字列を全論文で共有）"""
+    return tuple(sys.intern(name) for name in names if name)
 
-@dataclass
+
+@dataclass(slots=True)
 class Paper:
-    """論文データクラス"""
+    """
+    論文データクラス
+
+    大量取得時のメモリ削減のため __slots__ を使い、著者名は intern 済みの
+    タプルで保持する。同じ論文は複数セクション間で同一インスタンスを共有する。
+    """
     title: str
-    authors: List[str]
+    authors: Tuple[str, ...]
     summary: str
     published: datetime
     url: str
@@ -41,12 +74,189 @@ class Paper:
     ai_summary: Optional[str] = None
 
 
+class DeadlineExceeded(Exception):
+    """実行期限を過ぎた"""
+
+
+class CircuitOpenError(Exception):
+    """サーキットブレーカーが開いているため呼び出しを行わなかった"""
+
+
+class Deadline:
+    """
+    実行全体の期限
+
+    各ステージには stage() で予算を切り出し、外部呼び出しのタイムアウトは
+    timeout() で残り時間以内に抑える。
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float) -> float:
+        """残り時間とcapの小さい方を返す（残り時間がなければDeadlineExceeded）"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("実行期限を過ぎました")
+        return min(cap, remaining)
+
+    def stage(self, share: float, reserve: float = 0.0) -> "Deadline":
+        """
+        全体予算のshare割合を上限とするステージ期限を作成
+
+        Args:
+            share: 全体予算に対する割合
+            reserve: 後続ステージのために残しておく割合
+        """
+        budget = min(self.seconds * share, self.remaining() - self.seconds * reserve)
+        return Deadline(max(budget, 0.0))
+
+
+def request_timeout(deadline: Optional[Deadline], default: float) -> float:
+    """期限を考慮したタイムアウト秒数"""
+    return deadline.timeout(default) if deadline else default
+
+
+class CircuitBreaker:
+    """
+    外部ホストごとのサーキットブレーカー
+
+    連続failure_threshold回失敗すると開き、reset_seconds経過するまで
+    呼び出しを即座に失敗させる。経過後は1回だけ試行（半開）し、その結果が
+    出るまで他の呼び出しは即座に失敗させる。試行が成功すれば閉じ、失敗すれば再び開く。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_seconds: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """開いている場合（半開で試行中の場合を含む）はCircuitOpenErrorを送出"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._probing or time.monotonic() - self._opened_at < self.reset_seconds:
+                raise CircuitOpenError(f"{self.name}への呼び出しを停止中です")
+            # 半開状態: この1回だけ通し、結果で開閉を決める
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing:
+                # 半開での試行に失敗したので再び開く
+                self._opened_at = time.monotonic()
+                self._probing = False
+            elif self._failures >= self.failure_threshold and self._opened_at is None:
+                self._opened_at = time.monotonic()
+                logger.warning(f"{self.name}で{self._failures}回連続で失敗したため呼び出しを停止します")
+
+    def release(self) -> None:
+        """期限切れなどで結果が分からないまま終わった場合に、半開の試行枠を戻す"""
+        with self._lock:
+            self._probing = False
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """fnを呼び出し、結果に応じて状態を更新"""
+        self.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except (DeadlineExceeded, CircuitOpenError):
+            self.release()
+            raise
+        except Exception as e:
+            if _is_host_failure(e):
+                self.record_failure()
+            else:
+                # 4xxなどはホスト自体は応答しているので成功として扱う
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(host: str) -> CircuitBreaker:
+    """ホストごとのサーキットブレーカーを取得（なければ作成）"""
+    with _circuit_breakers_lock:
+        if host not in _circuit_breakers:
+            _circuit_breakers[host] = CircuitBreaker(host)
+        return _circuit_breakers[host]
+
+
+def _is_host_failure(error: Exception) -> bool:
+    """ホスト側の障害とみなすエラーか（4xxなどリクエスト起因のエラーは除く）"""
+    if isinstance(error, (DeadlineExceeded, CircuitOpenError)):
+        return False
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    return status is None or status >= 500 or status == 429
+
+
+def http_request(method: str, url: str, deadline: Optional[Deadline] = None,
+                 timeout: float = 30, **kwargs) -> requests.Response:
+    """
+    期限とサーキットブレーカーを適用したHTTPリクエスト
+
+    Args:
+        method: HTTPメソッド
+        url: URL
+        deadline: 実行期限（Noneなら timeout のみ）
+        timeout: 1回のリクエストのタイムアウト上限（秒）
+
+    Returns:
+        レスポンス（ステータスがエラーの場合は例外）
+    """
+    timeout = request_timeout(deadline, timeout)
+
+    def _send() -> requests.Response:
+        response = requests.request(method, url, timeout=timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    return get_circuit_breaker(urlparse(url).netloc).call(_send)
+
+
 class ArxivFetcher:
-    """arXivから論文を取得するクラス"""
+    """
+    arXivから論文を取得するクラス
 
-    def __init__(self, query: str, max_results: int = 20):
+    arXiv APIはリクエスト間隔（3秒）の制限があるため、クライアントを共有し、
+    複数スレッドから呼ばれても検索は1件ずつ順番に実行する。
+    """
+
+    HOST = "export.arxiv.org"
+
+    def __init__(self, query: str, max_results: int = 20, deadline: Optional[Deadline] = None,
+                 result_timeout: float = 60):
         self.query = query
         self.max_results = max_results
+        self.deadline = deadline
+        self.result_timeout = result_timeout
+        # 再試行は実行期限とサーキットブレーカーに任せる
+        self.client = arxiv.Client(num_retries=0)
+        self._lock = threading.Lock()
 
     def fetch_papers(self, days_back: int = 1) -> List[Paper]:
         """
@@ -73,21 +283,12 @@ class ArxivFetcher:
 
         papers = []
         try:
-            for result in search.results():
+            for result in self._collect(search, allow_partial=True):
                 # 公開日フィルタ
                 if result.published.replace(tzinfo=None) < since_date:
                     continue
 
-                paper = Paper(
-                    title=result.title,
-                    authors=[a.name for a in result.authors],
-                    summary=result.summary.replace('\n', ' '),
-                    published=result.published,
-                    url=result.entry_id,
-                    pdf_url=result.pdf_url,
-                    arxiv_id=result.entry_id.split('/')[-1]
-                )
-                papers.append(paper)
+                papers.append(self._to_paper(result))
 
             logger.info(f"{len(papers)}件の論文を取得しました")
             return papers
@@ -96,13 +297,105 @@ class ArxivFetcher:
             logger.error(f"論文取得エラー: {e}")
             return []
 
+    def fetch_papers_for_date(self, day: date) -> List[Paper]:
+        """
+        指定日（UTC）に投稿された論文を取得（バックフィル用）
+
+        取得に失敗した場合は例外をそのまま送出する。
+
+        Args:
+            day: 対象日
+
+        Returns:
+            論文リスト
+        """
+        window = f"{day:%Y%m%d}0000 TO {day:%Y%m%d}2359"
+        logger.info(f"arXivから{day}の論文を取得します: query={self.query}")
+
+        search = arxiv.Search(
+            query=f"({self.query}) AND submittedDate:[{window}]",
+            max_results=self.max_results,
+            sort_by=arxiv.SortCriterion.SubmittedDate,
+            sort_order=arxiv.SortOrder.Descending
+        )
+        papers = [self._to_paper(result) for result in self._collect(search, allow_partial=False)]
+        logger.info(f"arXivから{day}の論文{len(papers)}件を取得しました")
+        return papers
+
+    def _collect(self, search: "arxiv.Search", allow_partial: bool) -> List["arxiv.Result"]:
+        """
+        検索結果を別スレッドで取得し、1件ごとに期限付きで受け取る
+
+        arXivクライアントのリクエストにはタイムアウトがないため、応答が止まった
+        場合はスレッドを切り離して打ち切る。
+
+        Args:
+            search: 検索条件
+            allow_partial: 打ち切った場合にそれまでの結果を返すか（Falseなら例外）
+        """
+        breaker = get_circuit_breaker(self.HOST)
+        breaker.before_call()
+
+        items: queue.Queue = queue.Queue()
+        done = object()
+
+        def produce():
+            try:
+                with self._lock:
+                    for result in self.client.results(search):
+                        items.put(result)
+                items.put(done)
+            except Exception as e:
+                items.put(e)
+
+        threading.Thread(target=produce, daemon=True).start()
+
+        results = []
+        while True:
+            try:
+                item = items.get(timeout=request_timeout(self.deadline, self.result_timeout))
+            except (queue.Empty, DeadlineExceeded) as e:
+                if isinstance(e, queue.Empty):
+                    breaker.record_failure()
+                else:
+                    breaker.release()
+                if not allow_partial:
+                    raise DeadlineExceeded("arXivからの取得が期限内に終わりませんでした") from e
+                logger.warning(f"arXivの取得を打ち切りました（取得済み{len(results)}件）")
+                return results
+
+            if item is done:
+                breaker.record_success()
+                return results
+            if isinstance(item, Exception):
+                if _is_host_failure(item):
+                    breaker.record_failure()
+                else:
+                    breaker.release()
+                raise item
+            results.append(item)
+
+    @staticmethod
+    def _to_paper(result) -> Paper:
+        """arxiv.ResultをPaperに変換"""
+        return Paper(
+            title=result.title,
+            authors=intern_authors(a.name for a in result.authors),
+            summary=result.summary.replace('\n', ' '),
+            published=result.published,
+            url=result.entry_id,
+            pdf_url=result.pdf_url,
+            arxiv_id=result.entry_id.split('/')[-1]
+        )
+
 
 class SemanticScholarClient:
     """Semantic Scholar APIクライアント"""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, deadline: Optional[Deadline] = None):
         self.base_url = "https://api.semanticscholar.org/graph/v1"
         self.api_key = api_key
+        self.deadline = deadline
         self.headers = {}
         if api_key:
             self.headers["x-api-key"] = api_key
@@ -123,8 +416,7 @@ class SemanticScholarClient:
         }
 
         try:
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
-            response.raise_for_status()
+            response = http_request("GET", url, self.deadline, timeout=10, params=params, headers=self.headers)
             return response.json()
         except Exception as e:
             logger.debug(f"Semantic Scholar取得エラー ({arxiv_id}): {e}")
@@ -143,6 +435,9 @@ class SemanticScholarClient:
         logger.info("Semantic Scholarで論文情報を付与します")
 
         for paper in papers:
+            if self.deadline and self.deadline.expired():
+                logger.warning("期限を過ぎたためSemantic Scholarでの情報付与を打ち切りました")
+                break
             details = self.get_paper_details(paper.arxiv_id)
             if details:
                 paper.citation_count = details.get("citationCount", 0)
@@ -153,60 +448,61 @@ class SemanticScholarClient:
 class HuggingFaceDailyFetcher:
     """Hugging Face Daily Papers APIで人気順に論文を取得"""
 
-    def __init__(self, limit: int = 50):
+    def __init__(self, limit: int = 50, deadline: Optional[Deadline] = None):
         self.base_url = "https://huggingface.co/api/daily_papers"
         self.limit = limit
+        self.deadline = deadline
+        # 取得済み論文（キーワードごとに再取得・再生成しないようキャッシュ）
+        self._papers: Optional[List[Paper]] = None
 
     def fetch_papers(self, keyword: Optional[str] = None) -> List[Paper]:
         """
         Hugging Face Daily Papersからupvotes順に論文取得
 
+        APIへのリクエストは初回のみ行い、2回目以降はキャッシュ済みの
+        Paperインスタンスをキーワードで絞り込んで返す。
+
         Args:
             keyword: オプションのキーワードフィルタ（例: "RAG"）
 
         Returns:
             論文リスト（upvotes降順）
         """
-        logger.info(f"Hugging Face Daily Papersから論文を取得します: limit={self.limit}")
+        if self._papers is None:
+            self._papers = self._fetch_all()
 
-        try:
-            params = {"limit": self.limit}
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+        if not keyword:
+            return list(self._papers)
 
-            papers = []
-            for item in data:
-                paper_data = item.get("paper", item)
-                paper_id = paper_data.get("id", "")
+        return filter_by_keyword(self._papers, keyword)
 
-                # Hugging Face IDをarXiv IDに変換（例: 2602.02016 -> 2602.02016）
-                if "." not in paper_id:
-                    continue
+    def fetch_papers_for_date(self, day: date) -> List[Paper]:
+        """
+        指定日のDaily Papersを取得（バックフィル用）
 
-                # キーワードフィルタ
-                if keyword:
-                    title = paper_data.get("title", "").lower()
-                    summary = paper_data.get("summary", "").lower()
-                    if keyword.lower() not in title and keyword.lower() not in summary:
-                        continue
+        取得に失敗した場合は例外をそのまま送出する。
+
+        Args:
+            day: 対象日
 
-                paper = Paper(
-                    title=paper_data.get("title", ""),
-                    authors=[a.get("name", "") for a in paper_data.get("authors", [])],
-                    summary=paper_data.get("summary", ""),
-                    published=datetime.fromisoformat(paper_data.get("publishedAt", "").replace("Z", "+00:00")),
-                    url=f"https://huggingface.co/papers/{paper_id}",
-                    pdf_url=f"https://arxiv.org/pdf/{paper_id}.pdf",
-                    arxiv_id=paper_id,
-                    citation_count=paper_data.get("upvotes", 0),  # upvotesをスコアとして使用
-                    ai_summary=paper_data.get("ai_summary")
-                )
-                papers.append(paper)
-
-            # upvotes降順にソート
-            papers = sorted(papers, key=lambda p: p.citation_count, reverse=True)
+        Returns:
+            論文リスト（upvotes降順）
+        """
+        logger.info(f"Hugging Face Daily Papersから{day}の論文を取得します")
+        params = {"date": day.isoformat(), "limit": self.limit}
+        response = http_request("GET", self.base_url, self.deadline, timeout=30, params=params)
+        papers = self._parse_items(response.json())
+        logger.info(f"Hugging Faceから{day}の論文{len(papers)}件を取得しました")
+        return papers
 
+    def _fetch_all(self) -> List[Paper]:
+        """APIから論文を取得してPaperに変換（upvotes降順）"""
+        logger.info(f"Hugging Face Daily Papersから論文を取得します: limit={self.limit}")
+
+        try:
+            params = {"limit": self.limit}
+            response = http_request("GET", self.base_url, self.deadline, timeout=30, params=params)
+            papers = self._parse_items(response.json())
             logger.info(f"Hugging Faceから{len(papers)}件の論文を取得しました")
             return papers
 
@@ -214,14 +510,687 @@ class HuggingFaceDailyFetcher:
             logger.error(f"Hugging Face取得エラー: {e}")
             return []
 
+    def _parse_items(self, data: List[Dict]) -> List[Paper]:
+        """APIレスポンスをPaperのリストに変換（upvotes降順）"""
+        papers = []
+        seen_ids = set()
+        for item in data:
+            paper_data = item.get("paper", item)
+            paper_id = paper_data.get("id", "")
+
+            # Hugging Face IDをarXiv IDに変換（例: 2602.02016 -> 2602.02016）
+            if "." not in paper_id or paper_id in seen_ids:
+                continue
+            seen_ids.add(paper_id)
+
+            paper = Paper(
+                title=paper_data.get("title", ""),
+                authors=intern_authors(a.get("name", "") for a in paper_data.get("authors", [])),
+                summary=paper_data.get("summary", ""),
+                published=datetime.fromisoformat(paper_data.get("publishedAt", "").replace("Z", "+00:00")),
+                url=f"https://huggingface.co/papers/{paper_id}",
+                pdf_url=f"https://arxiv.org/pdf/{paper_id}.pdf",
+                arxiv_id=paper_id,
+                citation_count=paper_data.get("upvotes", 0),  # upvotesをスコアとして使用
+                ai_summary=paper_data.get("ai_summary")
+            )
+            papers.append(paper)
+
+        # upvotes降順にソート
+        papers.sort(key=lambda p: p.citation_count, reverse=True)
+        return papers
+
+
+class BackfillRunner:
+    """
+    指定期間の論文を日ごとに並列取得するクラス
+
+    取得済みの日は取得元・日付ごとにチェックポイントファイルに保存するため、
+    中断したバックフィルは再実行すると未取得の日だけを取得する。
+    """
+
+    def __init__(self, fetch_day: Callable[[date], List[Paper]], source: str,
+                 checkpoint_path: str = ".cache/backfill/checkpoint.json", max_workers: int = 4):
+        self.fetch_day = fetch_day
+        self.source = source
+        self.checkpoint_path = Path(checkpoint_path)
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._checkpoint: Dict = {}
+
+    def _load_checkpoint(self, start: date, end: date) -> Tuple[Dict[str, List[Dict]], Dict[str, str]]:
+        """
+        チェックポイントから期間内の取得済みの日を読み込む
+
+        期間が前回と異なっても（終了日を省略して翌日に再実行した場合など）、
+        期間内の取得済みの日は再利用する。ただしその日のうちに取得した日は
+        後から論文が追加されている可能性があるため、別の日に再実行した場合は取得し直す。
+
+        Returns:
+            ({日付: 論文リスト}, {日付: 取得日})
+        """
+        if not self.checkpoint_path.exists():
+            return {}, {}
+        try:
+            with self.checkpoint_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"チェックポイントの読み込みに失敗（最初から取得します）: {e}")
+            return {}, {}
+
+        if data.get("source") != self.source:
+            logger.info("チェックポイントの取得元が異なるため最初から取得します")
+            return {}, {}
+
+        today = date.today().isoformat()
+        fetched_on = data.get("fetched_on", {})
+        days, reused_on = {}, {}
+        for day, papers in data.get("days", {}).items():
+            fetched = fetched_on.get(day, today)
+            if start.isoformat() <= day <= end.isoformat() and (fetched > day or fetched == today):
+                days[day] = papers
+                reused_on[day] = fetched
+        return days, reused_on
+
+    def _save_checkpoint(self) -> None:
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(self._checkpoint, f, ensure_ascii=False)
+        tmp_path.replace(self.checkpoint_path)
+
+    def clear(self) -> None:
+        """バックフィル完了後にチェックポイントを削除"""
+        self.checkpoint_path.unlink(missing_ok=True)
+
+    def run(self, start: date, end: date) -> Tuple[List[Paper], List[date]]:
+        """
+        期間内の論文を取得
+
+        Args:
+            start: 開始日
+            end: 終了日（この日を含む）
+
+        Returns:
+            (arXiv IDで重複除去した論文リスト（スコア降順）, 取得に失敗した日のリスト)
+        """
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        done, fetched_on = self._load_checkpoint(start, end)
+        self._checkpoint = {"source": self.source, "days": done, "fetched_on": fetched_on}
+
+        pending = [d for d in days if d.isoformat() not in done]
+        logger.info(f"バックフィル: {start}〜{end}（{len(days)}日, 取得済み{len(days) - len(pending)}日）")
+
+        failed = []
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(self.fetch_day, d): d for d in pending}
+                for future in as_completed(futures):
+                    day = futures[future]
+                    try:
+                        papers = future.result()
+                    except Exception as e:
+                        logger.error(f"バックフィル取得エラー ({day}): {e}")
+                        failed.append(day)
+                        continue
+                    with self._lock:
+                        done[day.isoformat()] = [self._paper_to_dict(p) for p in papers]
+                        fetched_on[day.isoformat()] = date.today().isoformat()
+                        self._save_checkpoint()
+
+        merged: Dict[str, Paper] = {}
+        for day_papers in done.values():
+            for item in day_papers:
+                paper = self._paper_from_dict(item)
+                current = merged.get(paper.arxiv_id)
+                if current is None or paper.citation_count > current.citation_count:
+                    merged[paper.arxiv_id] = paper
+
+        papers = sorted(merged.values(), key=lambda p: p.citation_count, reverse=True)
+        logger.info(f"バックフィルで{len(papers)}件の論文を取得しました（失敗{len(failed)}日）")
+        return papers, sorted(failed)
+
+    @staticmethod
+    def _paper_to_dict(paper: Paper) -> Dict:
+        data = asdict(paper)
+        data["authors"] = list(paper.authors)
+        data["published"] = paper.published.isoformat()
+        return data
+
+    @staticmethod
+    def _paper_from_dict(data: Dict) -> Paper:
+        data = dict(data)
+        data["authors"] = intern_authors(data.get("authors", []))
+        data["published"] = datetime.fromisoformat(data["published"])
+        return Paper(**data)
+
+
+class FullTextExtractor:
+    """
+    論文PDFを並列ダウンロードして本文テキストを抽出するクラス
+
+    PDFはチャンク単位でディスクにストリーミング保存し（サイズ上限あり）、
+    抽出したテキストはarXiv IDごとにキャッシュするため、同じPDFは
+    実行をまたいで一度しか処理しない。
+    """
+
+    INTRO_PATTERN = re.compile(r"^\s*(?:\d+\.?|[IVX]+\.)?\s*introduction\s*$", re.IGNORECASE | re.MULTILINE)
+    CONCLUSION_PATTERN = re.compile(
+        r"^\s*(?:\d+\.?|[IVX]+\.)?\s*(?:conclusions?|concluding remarks|discussion and conclusions?)\s*$",
+        re.IGNORECASE | re.MULTILINE
+    )
+    END_PATTERN = re.compile(r"^\s*(?:references|bibliography|acknowledge?ments?)\s*$", re.IGNORECASE | re.MULTILINE)
+    HEADING_PATTERN = re.compile(r"^\s*(?:\d+|[IVX]+)\.?\s+[A-Z][^\n]{0,80}$", re.MULTILINE)
+
+    def __init__(self, cache_dir: str = ".cache/fulltext", max_workers: int = 4,
+                 max_bytes: int = 20 * 1024 * 1024, chunk_size: int = 64 * 1024,
+                 max_chars: int = 200_000, timeout: int = 30, deadline: Optional[Deadline] = None):
+        self.cache_dir = Path(cache_dir)
+        self.deadline = deadline
+        self.max_workers = max_workers
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.max_chars = max_chars
+        self.timeout = timeout
+        try:
+            from pypdf import PdfReader
+            self._reader_cls = PdfReader
+            self.enabled = True
+        except ImportError:
+            logger.warning("pypdfがインストールされていません。本文抽出をスキップします。")
+            self.enabled = False
+
+    def _cache_path(self, arxiv_id: str) -> Path:
+        return self.cache_dir / f"{arxiv_id.replace('/', '_')}.txt"
+
+    def is_cached(self, arxiv_id: str) -> bool:
+        return self._cache_path(arxiv_id).exists()
+
+    def fetch_all(self, papers: List[Paper]) -> int:
+        """
+        未キャッシュの論文PDFを並列にダウンロードして本文を抽出
+
+        Args:
+            papers: 論文リスト（重複があっても一度だけ処理）
+
+        Returns:
+            新たに抽出できた論文数
+        """
+        if not self.enabled:
+            return 0
+
+        targets = {}
+        for paper in papers:
+            if paper.pdf_url and not self.is_cached(paper.arxiv_id):
+                targets.setdefault(paper.arxiv_id, paper)
+        if not targets:
+            return 0
+
+        logger.info(f"PDF本文を取得します: {len(targets)}件（並列数{self.max_workers}）")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        extracted = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for ok in executor.map(self._process, targets.values()):
+                if ok:
+                    extracted += 1
+
+        logger.info(f"PDF本文を{extracted}件抽出しました")
+        return extracted
+
+    def _process(self, paper: Paper) -> bool:
+        """
+        1件のPDFをダウンロード→抽出→キャッシュ保存
+
+        サイズ超過・4xx・解析エラーなど再試行しても結果が変わらない失敗は
+        空のキャッシュを残して次回以降スキップする。通信エラーや5xx、
+        期限切れは次回の実行で再試行する。
+        """
+        pdf_path = self.cache_dir / f"{paper.arxiv_id.replace('/', '_')}.pdf.part"
+        try:
+            try:
+                downloaded = self._download(paper.pdf_url, pdf_path)
+            except Exception as e:
+                if self._is_permanent_http_error(e):
+                    logger.warning(f"PDFを取得できません（再試行しません） ({paper.arxiv_id}): {e}")
+                    self._write_negative_cache(paper.arxiv_id)
+                else:
+                    logger.warning(f"PDF本文取得エラー（次回再試行します） ({paper.arxiv_id}): {e}")
+                return False
+
+            if not downloaded:
+                self._write_negative_cache(paper.arxiv_id)
+                return False
+
+            try:
+                self._extract(pdf_path, self._cache_path(paper.arxiv_id))
+            except Exception as e:
+                logger.warning(f"PDFの解析に失敗しました（再試行しません） ({paper.arxiv_id}): {e}")
+                self._write_negative_cache(paper.arxiv_id)
+                return False
+            return True
+        finally:
+            pdf_path.unlink(missing_ok=True)
+
+    def _write_negative_cache(self, arxiv_id: str) -> None:
+        """本文なしとして空のキャッシュを残す（get_textはNoneを返す）"""
+        self._cache_path(arxiv_id).write_text("", encoding="utf-8")
+
+    @staticmethod
+    def _is_permanent_http_error(error: Exception) -> bool:
+        """再試行しても結果が変わらないHTTPエラーか（408/429を除く4xx）"""
+        status = getattr(getattr(error, "response", None), "status_code", None)
+        return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+    def _download(self, url: str, dest: Path) -> bool:
+        """PDFをチャンク単位でディスクへ保存（上限超過ならFalse）"""
+        with http_request("GET", url, self.deadline, timeout=self.timeout, stream=True) as response:
+            length = response.headers.get("Content-Length")
+            if length and length.isdigit() and int(length) > self.max_bytes:
+                logger.warning(f"PDFがサイズ上限を超えています（{length} bytes）: {url}")
+                return False
+
+            written = 0
+            with dest.open("wb") as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if self.deadline and self.deadline.expired():
+                        raise DeadlineExceeded("PDFのダウンロード中に期限を過ぎました")
+                    written += len(chunk)
+                    if written > self.max_bytes:
+                        logger.warning(f"PDFがサイズ上限を超えたため中断しました: {url}")
+                        return False
+                    f.write(chunk)
+        return True
+
+    def _extract(self, pdf_path: Path, dest: Path) -> None:
+        """ページ単位でテキストを抽出し、逐次キャッシュファイルへ書き出す"""
+        tmp_path = dest.with_suffix(".tmp")
+        try:
+            reader = self._reader_cls(str(pdf_path))
+            written = 0
+            with tmp_path.open("w", encoding="utf-8") as f:
+                for page in reader.pages:
+                    text = page.extract_text() or ""
+                    if written + len(text) > self.max_chars:
+                        text = text[:self.max_chars - written]
+                    f.write(text)
+                    f.write("\n")
+                    written += len(text)
+                    if written >= self.max_chars:
+                        break
+            tmp_path.replace(dest)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def get_text(self, arxiv_id: str) -> Optional[str]:
+        """キャッシュ済みの本文を読み込む（なければNone）"""
+        path = self._cache_path(arxiv_id)
+        if not path.exists():
+            return None
+        text = path.read_text(encoding="utf-8")
+        return text or None
+
+    def get_key_sections(self, arxiv_id: str, max_chars: int = 3000) -> Optional[str]:
+        """
+        本文から序論と結論を抜き出す
+
+        Args:
+            arxiv_id: arXiv ID
+            max_chars: 各セクションの最大文字数
+
+        Returns:
+            序論・結論のテキスト（本文がなければNone）
+        """
+        text = self.get_text(arxiv_id)
+        if not text:
+            return None
+
+        parts = []
+        intro = self._find_section(text, self.INTRO_PATTERN, first=True)
+        if intro:
+            parts.append(f"[Introduction]\n{intro[:max_chars]}")
+        conclusion = self._find_section(text, self.CONCLUSION_PATTERN, first=False)
+        if conclusion:
+            parts.append(f"[Conclusion]\n{conclusion[:max_chars]}")
+
+        if not parts:
+            # 見出しが見つからない場合は冒頭部分を使用
+            return text[:max_chars]
+        return "\n\n".join(parts)
+
+    def _find_section(self, text: str, pattern: re.Pattern, first: bool) -> Optional[str]:
+        """見出しパターンにマッチしたセクション本文を返す"""
+        matches = list(pattern.finditer(text))
+        if not matches:
+            return None
+        start = (matches[0] if first else matches[-1]).end()
+
+        end = len(text)
+        for end_pattern in (self.HEADING_PATTERN, self.END_PATTERN):
+            m = end_pattern.search(text, start)
+            if m:
+                end = min(end, m.start())
+        return text[start:end].strip() or None
+
+
+class HashEmbeddingProvider:
+    """
+    ハッシュベースの簡易埋め込み（外部APIなし・ローカル検証用）
+
+    単語をcrc32でハッシュしてdim次元に射影する。意味的な近さは
+    語彙の重なり程度しか表現できないが、実行ごとに結果が変わらない。
+    頻出語に引きずられないよう、単語の出現回数はlog(1 + 回数)で重み付けする。
+    """
+
+    # 別の単語と同じ次元に衝突した場合も、150語程度の要約では類似度0.08前後になる。
+    # それを上回る値にして、タイトルと要約の両方で言及している程度の論文だけを採用する
+    default_min_score = 0.1
+
+    def __init__(self, dim: int = 4096):
+        self.dim = dim
+        self.name = f"hash:{dim}"
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                h = zlib.crc32(token.encode("utf-8"))
+                vectors[i, h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        return np.sign(vectors) * np.log1p(np.abs(vectors))
+
+
+class OpenAIEmbeddingProvider:
+    """OpenAI Embeddings APIで埋め込みを生成"""
+
+    HOST = "api.openai.com"
+
+    # OpenAIの埋め込みは無関係な文章同士でも0.1〜0.2程度の類似度になるため、
+    # それより高い値を既定のしきい値にする
+    default_min_score = 0.3
+
+    def __init__(self, api_key: str, model: str = "text-embedding-3-small", batch_size: int = 100,
+                 deadline: Optional[Deadline] = None):
+        self.name = f"openai:{model}"
+        self.model = model
+        self.batch_size = batch_size
+        self.deadline = deadline
+        try:
+            from openai import OpenAI
+            # 再試行は実行期限とサーキットブレーカーに任せる（1回の呼び出しが期限を超えないように）
+            self.client = OpenAI(api_key=api_key, max_retries=0)
+            self.enabled = True
+        except ImportError:
+            logger.warning("OpenAIライブラリがインストールされていません。埋め込みをスキップします。")
+            self.enabled = False
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        rows = []
+        for start in range(0, len(texts), self.batch_size):
+            response = get_circuit_breaker(self.HOST).call(
+                self.client.embeddings.create,
+                model=self.model,
+                input=texts[start:start + self.batch_size],
+                timeout=request_timeout(self.deadline, 60)
+            )
+            rows.extend(item.embedding for item in response.data)
+        return np.asarray(rows, dtype=np.float32)
+
+
+class VectorStore:
+    """
+    arXiv IDで引ける埋め込みベクトルのディスクキャッシュ
+
+    ベクトルはfloat32の行列ファイルに追記し、読み込みはnp.memmapで行う。
+    行番号とarXiv IDの対応、各IDを最後に使った日はindex.jsonに保存する。
+    読み込み時にretention_days日以上使われていないベクトルを削除して行列を詰め直す。
+    """
+
+    def __init__(self, dir_path: str, provider_name: str, retention_days: int = 30):
+        self.dir_path = Path(dir_path)
+        self.provider_name = provider_name
+        self.retention_days = retention_days
+        self.matrix_path = self.dir_path / "vectors.f32"
+        self.index_path = self.dir_path / "index.json"
+        self.dim: Optional[int] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._last_used: Dict[str, str] = {}
+        self._matrix = None
+        self._load()
+
+    def _load(self) -> None:
+        if not self.index_path.exists():
+            return
+        try:
+            with self.index_path.open("r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception as e:
+            logger.warning(f"埋め込みインデックスの読み込みに失敗（新規作成扱い）: {e}")
+            return
+
+        if meta.get("provider") != self.provider_name:
+            logger.info(f"埋め込みモデルが変わったためキャッシュを作り直します: {meta.get('provider')} -> {self.provider_name}")
+            return
+
+        dim, ids = meta["dim"], meta["ids"]
+        expected = len(ids) * dim * 4
+        size = self.matrix_path.stat().st_size if self.matrix_path.exists() else 0
+        if size < expected:
+            # インデックスに対して行列が足りない場合は読み込めないため作り直す
+            logger.warning(f"埋め込み行列がインデックスより小さいためキャッシュを作り直します: {self.matrix_path}")
+            return
+        if size > expected:
+            # 書き込み途中で中断した場合の余分な行を切り詰める
+            with self.matrix_path.open("r+b") as f:
+                f.truncate(expected)
+
+        self.dim = dim
+        self._ids = ids
+        self._rows = {aid: i for i, aid in enumerate(self._ids)}
+        # 使用日のない古い形式のインデックスは今日使ったものとして扱う
+        today = datetime.now().strftime("%Y-%m-%d")
+        last_used = meta.get("last_used", {})
+        self._last_used = {aid: last_used.get(aid, today) for aid in self._ids}
+        self._prune()
+        logger.info(f"埋め込みキャッシュ {len(self._ids)}件を読み込みました: {self.dir_path}")
+
+    def _prune(self) -> None:
+        """retention_days日以上使われていないベクトルを削除して行列を詰め直す"""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        keep = [aid for aid in self._ids if self._last_used[aid] >= cutoff]
+        pruned = len(self._ids) - len(keep)
+        if pruned == 0:
+            return
+
+        if keep:
+            matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(len(self._ids), self.dim))
+            tmp_path = self.matrix_path.with_suffix(".tmp")
+            with tmp_path.open("wb") as f:
+                # 全件を一度に読み込まないよう行ブロックごとに書き出す
+                rows = [self._rows[aid] for aid in keep]
+                for start in range(0, len(rows), 4096):
+                    f.write(np.ascontiguousarray(matrix[rows[start:start + 4096]]).tobytes())
+            del matrix
+            tmp_path.replace(self.matrix_path)
+        else:
+            self.matrix_path.write_bytes(b"")
+
+        self._ids = keep
+        self._rows = {aid: i for i, aid in enumerate(self._ids)}
+        self._last_used = {aid: self._last_used[aid] for aid in self._ids}
+        self._save_index()
+        logger.info(f"{self.retention_days}日以上使われていない埋め込み {pruned}件を削除しました")
+
+    def _save_index(self) -> None:
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump({"provider": self.provider_name, "dim": self.dim, "ids": self._ids,
+                       "last_used": self._last_used}, f)
+        tmp_path.replace(self.index_path)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, arxiv_id: str) -> bool:
+        return arxiv_id in self._rows
+
+    def add(self, arxiv_ids: List[str], vectors: "np.ndarray") -> None:
+        """ベクトルを追記してインデックスを保存"""
+        if not arxiv_ids:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None or not self._ids:
+            self.dim = vectors.shape[1]
+            self._ids, self._rows, self._last_used = [], {}, {}
+            self.dir_path.mkdir(parents=True, exist_ok=True)
+            self.matrix_path.write_bytes(b"")
+
+        with self.matrix_path.open("ab") as f:
+            f.write(vectors.tobytes())
+        today = datetime.now().strftime("%Y-%m-%d")
+        for aid in arxiv_ids:
+            self._rows[aid] = len(self._ids)
+            self._ids.append(aid)
+            self._last_used[aid] = today
+        self._matrix = None
+        self._save_index()
+
+    def get(self, arxiv_ids: List[str]) -> "np.ndarray":
+        """指定IDのベクトルを行列で返す（使用日を更新）"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        stale = [aid for aid in arxiv_ids if self._last_used.get(aid) != today]
+        if stale:
+            self._last_used.update((aid, today) for aid in stale)
+            self._save_index()
+
+        if self._matrix is None:
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(len(self._ids), self.dim))
+        return np.asarray(self._matrix[[self._rows[aid] for aid in arxiv_ids]])
+
+
+class EmbeddingMatcher:
+    """埋め込みのコサイン類似度でキーワード（関心）ごとに論文を選ぶクラス"""
+
+    def __init__(self, provider, store: VectorStore, cluster_threshold: float = 0.9,
+                 min_score: Optional[float] = None):
+        self.provider = provider
+        self.store = store
+        self.cluster_threshold = cluster_threshold
+        # 未指定ならプロバイダごとの既定値（関連する論文がなければセクションは空になる）
+        self.min_score = min_score if min_score is not None else getattr(provider, "default_min_score", 0.0)
+        self.enabled = np is not None and getattr(provider, "enabled", True)
+        if np is None:
+            logger.warning("numpyがインストールされていません。埋め込みマッチングをスキップします。")
+
+    @staticmethod
+    def _normalize(vectors: "np.ndarray") -> "np.ndarray":
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def embed_papers(self, papers: List[Paper]) -> "np.ndarray":
+        """
+        論文の埋め込み行列を返す（未キャッシュの論文のみ埋め込みを生成）
+
+        Args:
+            papers: 論文リスト
+
+        Returns:
+            正規化済みの埋め込み行列（len(papers) × dim）
+        """
+        new_papers = {}
+        for paper in papers:
+            if paper.arxiv_id not in self.store:
+                new_papers.setdefault(paper.arxiv_id, paper)
+
+        if new_papers:
+            logger.info(f"埋め込みを生成します: {len(new_papers)}件（キャッシュ済み{len(papers) - len(new_papers)}件）")
+            texts = [f"{p.title}\n{p.summary}" for p in new_papers.values()]
+            self.store.add(list(new_papers), self._normalize(self.provider.embed(texts)))
+
+        return self.store.get([p.arxiv_id for p in papers])
+
+    def cluster(self, vectors: "np.ndarray", block_size: int = 256) -> List[int]:
+        """
+        類似度がしきい値以上の論文を同じクラスタにまとめる
+
+        入力順（人気順）に未割当の論文を代表として、近い論文を同じクラスタに入れる。
+        類似度は行ブロックごとに計算し、割当済みの論文より前の列は計算しない。
+
+        Args:
+            vectors: 正規化済みの埋め込み行列
+            block_size: 一度に計算する類似度行列の行数（作業メモリは block_size × 論文数 に比例）
+
+        Returns:
+            各論文のクラスタ番号（代表論文のインデックス）
+        """
+        n = len(vectors)
+        labels = np.full(n, -1, dtype=np.int64)
+        for start in range(0, n, block_size):
+            # start より前の論文はすべて割当済みのため、start以降の列だけを計算する
+            block = vectors[start:start + block_size] @ vectors[start:].T >= self.cluster_threshold
+            rest = labels[start:]
+            for offset, row in enumerate(block):
+                if rest[offset] != -1:
+                    continue
+                rest[row & (rest == -1)] = start + offset
+                rest[offset] = start + offset
+        return labels.tolist()
+
+    def rank_sections(self, papers: List[Paper], interests: Dict[str, str], top_k: int = 10) -> Optional[Dict[str, List[Paper]]]:
+        """
+        関心ごとに類似度上位の論文を選ぶ
+
+        Args:
+            papers: 候補論文リスト（人気順）
+            interests: {セクション名: 関心テキスト}
+            top_k: セクションごとの件数
+
+        Returns:
+            {セクション名: 論文リスト}（失敗時はNone）
+        """
+        if not self.enabled or not papers or not interests:
+            return None
+
+        try:
+            paper_vectors = self.embed_papers(papers)
+            interest_vectors = self._normalize(self.provider.embed(list(interests.values())).astype(np.float32))
+            scores = paper_vectors @ interest_vectors.T
+            labels = self.cluster(paper_vectors)
+        except Exception as e:
+            logger.error(f"埋め込みマッチングエラー: {e}")
+            return None
+
+        results = {}
+        for j, name in enumerate(interests):
+            picked, used_clusters, suppressed = [], set(), 0
+            for i in np.argsort(-scores[:, j], kind="stable"):
+                if len(picked) >= top_k or scores[i, j] <= 0 or scores[i, j] < self.min_score:
+                    break
+                if labels[i] in used_clusters:
+                    suppressed += 1
+                    continue
+                used_clusters.add(labels[i])
+                picked.append(papers[i])
+            if suppressed:
+                logger.info(f"{name}: 類似論文 {suppressed}件を除外しました")
+            results[name] = picked
+        return results
+
 
 class LLMSummarizer:
     """LLMで要約を生成するクラス"""
 
-    def __init__(self, api_key: str, model: str = "gpt-4o-mini", max_length: int = 200):
+    HOST = "api.openai.com"
+
+    def __init__(self, api_key: str, model: str = "gpt-4o-mini", max_length: int = 200,
+                 fulltext: Optional[FullTextExtractor] = None, deadline: Optional[Deadline] = None):
+        self.fulltext = fulltext
+        self.deadline = deadline
         try:
             from openai import OpenAI
-            self.client = OpenAI(api_key=api_key)
+            # 再試行は実行期限とサーキットブレーカーに任せる（1回の呼び出しが期限を超えないように）
+            self.client = OpenAI(api_key=api_key, max_retries=0)
             self.model = model
             self.max_length = max_length
             self.enabled = True
@@ -246,16 +1215,21 @@ class LLMSummarizer:
             return None
 
         try:
+            key_sections = self.fulltext.get_key_sections(paper.arxiv_id) if self.fulltext else None
+            body_text = f"\n\n本文抜粋（序論・結論）:\n{key_sections}\n" if key_sections else ""
+
             prompt = f"""以下の論文の要約を日本語で{self.max_length}文字以内で簡潔にまとめてください。
 
 タイトル: {paper.title}
 
 要約:
 {paper.summary}
-
+{body_text}
 重要な貢献とインパクトを中心にまとめてください。"""
 
-            response = self.client.chat.completions.create(
+            response = get_circuit_breaker(self.HOST).call(
+                self.client.chat.completions.create,
+                timeout=request_timeout(self.deadline, 60),
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "あなたは論文の要約を作成するアシスタントです。"},
@@ -272,11 +1246,131 @@ class LLMSummarizer:
             return None
 
 
+class PaperRenderer:
+    """
+    論文のEmail HTML / Slack mrkdwn を生成するクラス
+
+    テンプレートはクラス定義時に一度だけ作成し、論文ごとの断片は
+    出力形式ごとにキャッシュする（順位以外を埋めたテンプレートを保持）。
+    同じ論文が複数セクションや複数の宛先に現れても描画は一度で済む。
+    """
+
+    EMAIL_STYLE = """
+    body { font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }
+    .paper { margin: 20px 0; padding: 15px; border: 1px solid #ddd; border-radius: 8px; }
+    .authors { font-style: italic; }
+    .footer { margin-top: 30px; border-top: 1px solid #ddd; color: #666; font-size: 12px; }
+    """
+
+    EMAIL_DOCUMENT = Template("""<html>
+<head>
+<meta charset="utf-8">
+<style>${style}</style>
+</head>
+<body>
+<h1>${title}</h1>
+${body}
+<p class="footer">Powered by <a href="https://huggingface.co/papers">Hugging Face Papers</a></p>
+</body>
+</html>
+""")
+    EMAIL_SECTION = Template("<h2>📚 ${name}（${count}件）</h2>\n")
+    EMAIL_PAPER = Template("""<div class="paper">
+<h3>${rank}. ${title}</h3>
+<p class="authors">${authors}</p>
+<p>${summary}${score}</p>
+<p><a href="${hf_url}">Hugging Face</a> | <a href="https://arxiv.org/abs/${arxiv_id}">arXiv</a> | <a href="${pdf_url}">PDF</a></p>
+</div>
+""")
+    SLACK_PAPER = Template("*${rank}. ${title}*\n_${authors}_\n${summary}${score}\n<${url}|arXiv> | <${pdf_url}|PDF>")
+
+    def __init__(self):
+        self._cache: Dict[Tuple[str, str, Optional[str], int], Template] = {}
+
+    def email_document(self, title: str, sections: List[Tuple[str, List[Paper]]]) -> str:
+        """セクションごとの論文リストからEmail本文のHTMLを生成"""
+        parts = []
+        for section_name, papers in sections:
+            if not papers:
+                continue
+            parts.append(self.EMAIL_SECTION.substitute(name=html.escape(section_name), count=len(papers)))
+            parts.extend(self.email_paper(paper, i) for i, paper in enumerate(papers, 1))
+
+        return self.EMAIL_DOCUMENT.substitute(style=self.EMAIL_STYLE, title=html.escape(title), body="".join(parts))
+
+    def email_paper(self, paper: Paper, rank: int) -> str:
+        """論文1件分のHTML断片"""
+        return self._fragment("email", paper, self._build_email).substitute(rank=rank)
+
+    def slack_paper(self, paper: Paper, rank: int) -> str:
+        """論文1件分のSlack mrkdwnテキスト"""
+        return self._fragment("slack", paper, self._build_slack).substitute(rank=rank)
+
+    def _fragment(self, fmt: str, paper: Paper, build: Callable[[Paper], str]) -> Template:
+        # 要約・スコアは送信前に更新されることがあるためキーに含める
+        key = (fmt, paper.arxiv_id, paper.ai_summary, paper.citation_count)
+        fragment = self._cache.get(key)
+        if fragment is None:
+            fragment = self._cache[key] = Template(build(paper))
+        return fragment
+
+    @staticmethod
+    def _fill(template: Template, **fields: str) -> str:
+        """順位以外を埋める（値中の$は後の順位埋め込みで元に戻るようエスケープ）"""
+        return template.safe_substitute({k: v.replace("$", "$$") for k, v in fields.items()})
+
+    def _build_email(self, paper: Paper) -> str:
+        summary = paper.ai_summary if paper.ai_summary else paper.summary[:300] + "..."
+        # Hugging Face URL判定
+        hf_url = f"https://huggingface.co/papers/{paper.arxiv_id}" if "huggingface.co" in paper.url else paper.url
+        return self._fill(
+            self.EMAIL_PAPER,
+            title=html.escape(paper.title),
+            authors=html.escape(", ".join(paper.authors[:3]) + (" et al." if len(paper.authors) > 3 else "")),
+            summary=html.escape(summary),
+            score=f" | 👍 {paper.citation_count} upvotes" if paper.citation_count > 0 else "",
+            hf_url=html.escape(hf_url),
+            arxiv_id=html.escape(paper.arxiv_id),
+            pdf_url=html.escape(paper.pdf_url)
+        )
+
+    def _build_slack(self, paper: Paper) -> str:
+        summary = paper.ai_summary if paper.ai_summary else self._truncate_text(paper.summary, 200)
+        return self._fill(
+            self.SLACK_PAPER,
+            title=self._escape_slack(paper.title),
+            authors=self._escape_slack("、".join(paper.authors[:3]) + ("他" if len(paper.authors) > 3 else "")),
+            summary=self._escape_slack(summary),
+            score=f" | 引用{paper.citation_count}回" if paper.citation_count > 0 else "",
+            url=self._escape_slack(paper.url),
+            pdf_url=self._escape_slack(paper.pdf_url)
+        )
+
+    @staticmethod
+    def _escape_slack(text: str) -> str:
+        """Slack mrkdwnの制御文字をエスケープ"""
+        return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+    @staticmethod
+    def _truncate_text(text: str, max_length: int) -> str:
+        """テキストを指定長さに切り詰める"""
+        if len(text) <= max_length:
+            return text
+        return text[:max_length-3] + "..."
+
+
+# 全通知で共有するレンダラー（論文ごとの断片キャッシュを共有する）
+default_renderer = PaperRenderer()
+
+
 class SlackNotifier:
     """Slackに通知を送るクラス"""
 
-    def __init__(self, webhook_url: str):
+    def __init__(self, webhook_url: str, deadline: Optional[Deadline] = None,
+                 renderer: Optional[PaperRenderer] = None):
         self.webhook_url = webhook_url
+        self.deadline = deadline
+        self.renderer = renderer or default_renderer
 
     def send_papers(self, papers: List[Paper], channel_name: str = "論文ボット") -> bool:
         """
@@ -309,19 +1403,11 @@ class SlackNotifier:
 
         # 論文ごとのブロック
         for i, paper in enumerate(papers, 1):
-            citation_info = f" | 引用{paper.citation_count}回" if paper.citation_count > 0 else ""
-
-            # 要約がある場合
-            summary_text = paper.ai_summary if paper.ai_summary else self._truncate_text(paper.summary, 200)
-
             paper_block = {
                 "type": "section",
                 "text": {
                     "type": "mrkdwn",
-                    "text": f"*{i}. {paper.title}*\n"
-                            f"_{'、'.join(paper.authors[:3])}{'他' if len(paper.authors) > 3 else ''}_\n"
-                            f"{summary_text}{citation_info}\n"
-                            f"<{paper.url}|arXiv> | <{paper.pdf_url}|PDF>"
+                    "text": self.renderer.slack_paper(paper, i)
                 }
             }
             blocks.append(paper_block)
@@ -331,29 +1417,25 @@ class SlackNotifier:
         payload = {"blocks": blocks}
 
         try:
-            response = requests.post(self.webhook_url, json=payload, timeout=10)
-            response.raise_for_status()
+            http_request("POST", self.webhook_url, self.deadline, timeout=10, json=payload)
             logger.info(f"Slackに送信しました: {count}件")
             return True
         except Exception as e:
             logger.error(f"Slack送信エラー: {e}")
             return False
 
-    def _truncate_text(self, text: str, max_length: int) -> str:
-        """テキストを指定長さに切り詰める"""
-        if len(text) <= max_length:
-            return text
-        return text[:max_length-3] + "..."
-
 
 class EmailNotifier:
     """Emailで通知を送るクラス（Resend使用）"""
 
-    def __init__(self, api_key: str, from_email: str, to_email: str):
+    def __init__(self, api_key: str, from_email: str, to_email: str, deadline: Optional[Deadline] = None,
+                 renderer: Optional[PaperRenderer] = None):
         self.api_key = api_key
         self.from_email = from_email
         self.to_email = to_email
         self.base_url = "https://api.resend.com/emails"
+        self.deadline = deadline
+        self.renderer = renderer or default_renderer
 
     def send_papers_sections(self, papers_sections: List[tuple]) -> bool:
         """
@@ -372,50 +1454,16 @@ class EmailNotifier:
         today = datetime.now().strftime("%Y/%m/%d")
         total_count = sum(len(papers) for _, papers in papers_sections)
 
-        # HTMLメール構築
-        html_parts = [f"<h1>🔥 {today} AI論文ランキング（全{total_count}件）</h1>"]
-
-        for section_name, papers in papers_sections:
-            if not papers:
-                continue
+        subject = f"🔥 {today} AI論文ランキング（全{total_count}件）"
 
-            html_parts.append(f"<h2>📚 {section_name}（{len(papers)}件）</h2>")
-
-            for i, paper in enumerate(papers, 1):
-                # Hugging Face URL判定
-                hf_url = f"https://huggingface.co/papers/{paper.arxiv_id}" if "huggingface.co" in paper.url else paper.url
-
-                upvote_info = f" | 👍 {paper.citation_count} upvotes" if paper.citation_count > 0 else ""
-                summary_text = paper.ai_summary if paper.ai_summary else paper.summary[:300] + "..."
-
-                html_parts.append(f"""
-                <div style="margin: 20px 0; padding: 15px; border: 1px solid #ddd; border-radius: 8px;">
-                    <h3>{i}. {paper.title}</h3>
-                    <p><em>{', '.join(paper.authors[:3])}{' et al.' if len(paper.authors) > 3 else ''}</em></p>
-                    <p>{summary_text}{upvote_info}</p>
-                    <p>
-                        <a href="{hf_url}">Hugging Face</a> | <a href="https://arxiv.org/abs/{paper.arxiv_id}">arXiv</a> | <a href="{paper.pdf_url}">PDF</a>
-                    </p>
-                </div>
-                """)
-
-        html_content = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px;">
-            {''.join(html_parts)}
-            <hr style="margin-top: 30px;">
-            <p style="color: #666; font-size: 12px;">
-                Powered by <a href="https://huggingface.co/papers">Hugging Face Papers</a>
-            </p>
-        </body>
-        </html>
-        """
+        # HTMLメール構築
+        html_content = self.renderer.email_document(subject, papers_sections)
 
         # 送信
         payload = {
             "from": self.from_email,
             "to": [self.to_email],
-            "subject": f"🔥 {today} AI論文ランキング（全{total_count}件）",
+            "subject": subject,
             "html": html_content
         }
 
@@ -425,8 +1473,7 @@ class EmailNotifier:
         }
 
         try:
-            response = requests.post(self.base_url, json=payload, headers=headers, timeout=10)
-            response.raise_for_status()
+            http_request("POST", self.base_url, self.deadline, timeout=10, json=payload, headers=headers)
             logger.info(f"Emailを送信しました: {total_count}件")
             return True
         except Exception as e:
@@ -480,6 +1527,14 @@ class SentPapersStore:
         logger.info(f"送信済みID {len(self._data)}件を保存しました: {self.file_path}")
 
 
+def filter_by_keyword(papers: List[Paper], keyword: str) -> List[Paper]:
+    """タイトルまたは要約にキーワードを含む論文に絞り込み"""
+    kw = keyword.lower()
+    filtered = [p for p in papers if kw in p.title.lower() or kw in p.summary.lower()]
+    logger.info(f"キーワード「{keyword}」で{len(filtered)}件に絞り込みました")
+    return filtered
+
+
 def filter_papers(papers: List[Paper], min_citations: int = 0) -> List[Paper]:
     """論文をフィルタリング"""
     filtered = [p for p in papers if p.citation_count >= min_citations]
@@ -488,8 +1543,82 @@ def filter_papers(papers: List[Paper], min_citations: int = 0) -> List[Paper]:
     return filtered
 
 
-def main():
+def deliver_sections(papers_sections: List[Tuple[str, List[Paper]]],
+                     email_notifier: Optional[EmailNotifier] = None,
+                     slack_notifier: Optional[SlackNotifier] = None) -> Tuple[int, set]:
+    """
+    各通知先にセクションを送信
+
+    Args:
+        papers_sections: [(セクション名, 論文リスト), ...] のリスト
+        email_notifier: Email通知（全セクションを送信）
+        slack_notifier: Slack通知（最初のセクションのみ送信）
+
+    Returns:
+        (送信に成功した通知先の数, 実際に送信できた論文のarXiv IDの集合)
+    """
+    success_count = 0
+    delivered_ids = set()
+
+    # Email
+    if email_notifier:
+        if email_notifier.send_papers_sections(papers_sections):
+            success_count += 1
+            delivered_ids.update(p.arxiv_id for _, papers in papers_sections for p in papers)
+
+    # Slack（最初のセクションのみ送信）
+    if slack_notifier and papers_sections:
+        if slack_notifier.send_papers(papers_sections[0][1]):
+            success_count += 1
+            delivered_ids.update(p.arxiv_id for p in papers_sections[0][1])
+
+    return success_count, delivered_ids
+
+
+def _build_embedding_matcher(deadline: Optional[Deadline] = None) -> Optional[EmbeddingMatcher]:
+    """
+    環境変数から埋め込みマッチャーを構築
+
+    hash埋め込みは動作確認用のため、EMBEDDING_PROVIDER=hashを明示した場合のみ使用する。
+
+    Returns:
+        埋め込みマッチャー（使用できるプロバイダがなければNone）
+    """
+    openai_key = os.getenv("OPENAI_API_KEY")
+    provider_name = (os.getenv("EMBEDDING_PROVIDER") or "openai").lower()
+
+    if provider_name == "openai":
+        if not openai_key:
+            logger.warning("OPENAI_API_KEYが未設定のため埋め込みマッチングを使わず、キーワードの文字列一致で絞り込みます")
+            return None
+        provider = OpenAIEmbeddingProvider(
+            openai_key, os.getenv("EMBEDDING_MODEL") or "text-embedding-3-small", deadline=deadline
+        )
+    elif provider_name == "hash":
+        provider = HashEmbeddingProvider()
+    else:
+        logger.warning(f"不明なEMBEDDING_PROVIDERです（キーワードの文字列一致で絞り込みます）: {provider_name}")
+        return None
+
+    store = VectorStore(os.getenv("EMBEDDING_CACHE_DIR") or ".cache/embeddings", provider.name)
+    min_score = os.getenv("EMBEDDING_MIN_SCORE")
+    return EmbeddingMatcher(
+        provider,
+        store,
+        cluster_threshold=float(os.getenv("EMBEDDING_CLUSTER_THRESHOLD") or "0.9"),
+        min_score=float(min_score) if min_score else None
+    )
+
+
+def main(argv: Optional[List[str]] = None):
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="論文を収集してEmail/Slackに通知するボット")
+    parser.add_argument("--backfill-from", default=os.getenv("BACKFILL_FROM") or None,
+                        help="バックフィル開始日（YYYY-MM-DD）。指定すると期間内の論文をまとめて送信")
+    parser.add_argument("--backfill-to", default=os.getenv("BACKFILL_TO") or None,
+                        help="バックフィル終了日（YYYY-MM-DD、省略時は今日）")
+    args = parser.parse_args(argv)
+
     logger.info("=" * 50)
     logger.info("Paper Slack Bot 開始")
     logger.info("=" * 50)
@@ -498,8 +1627,10 @@ def main():
     query = os.getenv("ARXIV_QUERY", "cat:cs.AI OR cat:cs.LG")
     max_papers = int(os.getenv("MAX_PAPERS", "100"))
     min_citations = int(os.getenv("MIN_CITATIONS", "0"))
+    days_back = int(os.getenv("DAYS_BACK") or "1")
     use_huggingface = os.getenv("USE_HUGGINGFACE", "true").lower() == "true"
     keyword_filter = os.getenv("KEYWORD_FILTER", "")  # 例: "RAG" でRAG関連のみ
+    use_embedding = (os.getenv("USE_EMBEDDING") or "false").lower() == "true"
 
     # 通知先（Slack or Email）
     webhook_url = os.getenv("SLACK_WEBHOOK_URL")
@@ -511,6 +1642,11 @@ def main():
         logger.error("通知先が設定されていません（SLACK_WEBHOOK_URL または RESEND_API_KEY + EMAIL_TO）")
         sys.exit(1)
 
+    # 実行全体の期限（ステージごとに予算を割り当て、送信分は最後まで確保する）
+    deadline = Deadline(float(os.getenv("RUN_DEADLINE_SECONDS") or "1200"))
+    send_reserve = STAGE_BUDGETS["send"]
+    fetch_deadline = deadline.stage(STAGE_BUDGETS["fetch"], reserve=send_reserve)
+
     # 送信済みIDストア（重複送信防止）
     sent_store = SentPapersStore()
 
@@ -524,44 +1660,85 @@ def main():
 
     # 1. 論文取得（Hugging Face or arXiv）
     all_papers_sections = []  # 複数セクション用
+    backfill = None
+    backfill_failed = []
+    period = ""
 
-    if use_huggingface:
+    if args.backfill_from:
+        # 期間指定のバックフィル（日ごとに並列取得、チェックポイントから再開）
+        try:
+            start = date.fromisoformat(args.backfill_from)
+            end = date.fromisoformat(args.backfill_to) if args.backfill_to else date.today()
+        except ValueError:
+            logger.error(f"バックフィル期間の日付はYYYY-MM-DD形式で指定してください: {args.backfill_from}〜{args.backfill_to or ''}")
+            sys.exit(1)
+        if start > end:
+            logger.error(f"バックフィル期間が不正です: {start}〜{end}")
+            sys.exit(1)
+
+        if use_huggingface:
+            fetcher = HuggingFaceDailyFetcher(limit=max_papers, deadline=fetch_deadline)
+        else:
+            fetcher = ArxivFetcher(query, max_papers, deadline=fetch_deadline)
+        backfill = BackfillRunner(
+            fetcher.fetch_papers_for_date,
+            source="huggingface" if use_huggingface else f"arxiv:{query}",
+            # arXivはレート制限があるため日ごとの取得も1件ずつ行う
+            max_workers=int(os.getenv("BACKFILL_WORKERS") or "4") if use_huggingface else 1
+        )
+        papers, backfill_failed = backfill.run(start, end)
+        pool = _dedup(papers)
+        period = f"（{start}〜{end}）"
+
+    elif use_huggingface:
         logger.info("Hugging Face Daily Papersを使用します")
-        fetcher = HuggingFaceDailyFetcher(limit=max_papers)
+        fetcher = HuggingFaceDailyFetcher(limit=max_papers, deadline=fetch_deadline)
+        pool = _dedup(fetcher.fetch_papers(keyword=None))
 
+    else:
+        logger.info("arXiv APIを使用します")
+        fetcher = ArxivFetcher(query, max_papers, deadline=fetch_deadline)
+        pool = _dedup(fetcher.fetch_papers(days_back=days_back))
+
+    if not pool:
+        logger.info("新しい論文はありませんでした（すべて送信済み）")
+        if backfill and not backfill_failed:
+            backfill.clear()
+        return
+
+    if use_huggingface:
         # 通常のTop10
-        general_papers = _dedup(fetcher.fetch_papers(keyword=None))
-        if general_papers:
-            all_papers_sections.append(("人気Top10", general_papers[:10]))
+        all_papers_sections.append((f"人気Top10{period}", pool[:10]))
 
         # キーワード関連のTop10（カンマ区切りで複数指定可能）
         if keyword_filter:
             keywords = [k.strip() for k in keyword_filter.split(",") if k.strip()]
+
+            # 埋め込みによる意味的マッチング（オプション、失敗時は文字列一致にフォールバック）
+            ranked = None
+            if use_embedding:
+                matcher = _build_embedding_matcher(fetch_deadline)
+                if matcher and matcher.enabled:
+                    ranked = matcher.rank_sections(pool, {kw: kw for kw in keywords}, top_k=10)
+
             for kw in keywords:
-                keyword_papers = _dedup(fetcher.fetch_papers(keyword=kw))
+                if ranked is not None:
+                    keyword_papers = ranked.get(kw, [])
+                else:
+                    keyword_papers = filter_by_keyword(pool, kw)
                 if keyword_papers:
-                    all_papers_sections.append((f"{kw} Top10", keyword_papers[:10]))
-
-        if not all_papers_sections:
-            logger.info("新しい論文はありませんでした（すべて送信済み）")
-            return
+                    all_papers_sections.append((f"{kw} Top10{period}", keyword_papers[:10]))
 
     else:
-        logger.info("arXiv APIを使用します")
-        fetcher = ArxivFetcher(query, max_papers)
-        papers = _dedup(fetcher.fetch_papers(days_back=1))
-
-        if not papers:
-            logger.info("新しい論文はありませんでした（すべて送信済み）")
-            return
-
-        all_papers_sections.append(("人気Top10", papers))
+        all_papers_sections.append((f"人気Top10{period}", pool))
 
     # 2. Semantic Scholarで情報付与 & 3. フィルタリング（arXivの場合）
     if not use_huggingface:
         api_key = os.getenv("SEMANTIC_SCHOLAR_API_KEY")
         if api_key or True:
-            semantic_client = SemanticScholarClient(api_key)
+            semantic_client = SemanticScholarClient(
+                api_key, deadline=deadline.stage(STAGE_BUDGETS["enrich"], reserve=send_reserve)
+            )
             for i, (section_name, papers) in enumerate(all_papers_sections):
                 all_papers_sections[i] = (section_name, semantic_client.enrich_papers(papers))
 
@@ -580,37 +1757,57 @@ def main():
     if openai_key:
         model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         max_length = int(os.getenv("SUMMARY_MAX_LENGTH", "200"))
-        summarizer = LLMSummarizer(openai_key, model, max_length)
+
+        summarize_deadline = deadline.stage(STAGE_BUDGETS["summarize"], reserve=send_reserve)
+
+        # PDF本文抽出（オプション）
+        fulltext = None
+        if (os.getenv("USE_FULLTEXT") or "false").lower() == "true":
+            fulltext = FullTextExtractor(
+                cache_dir=os.getenv("FULLTEXT_CACHE_DIR") or ".cache/fulltext",
+                max_workers=int(os.getenv("FULLTEXT_MAX_WORKERS") or "4"),
+                max_bytes=int(os.getenv("FULLTEXT_MAX_MB") or "20") * 1024 * 1024,
+                deadline=summarize_deadline
+            )
+            if fulltext.enabled:
+                targets = [p for _, papers in all_papers_sections for p in papers if not p.ai_summary]
+                fulltext.fetch_all(targets)
+
+        summarizer = LLMSummarizer(openai_key, model, max_length, fulltext=fulltext, deadline=summarize_deadline)
 
         if summarizer.enabled:
             logger.info("要約を生成します...")
             for section_name, papers in all_papers_sections:
                 for paper in papers:
+                    if summarize_deadline.expired():
+                        break
                     if not paper.ai_summary:
                         paper.ai_summary = summarizer.summarize(paper)
+            if summarize_deadline.expired():
+                logger.warning("期限を過ぎたため要約を打ち切りました（残りは元の要約で送信します）")
 
-    # 5. 通知送信
-    success_count = 0
+    # 5. 通知送信（期限を過ぎていても準備できたセクションは送信する）
+    send_deadline = Deadline(max(deadline.remaining(), deadline.seconds * send_reserve))
     total_papers = sum(len(papers) for _, papers in all_papers_sections)
 
-    # Email
+    email_notifier = None
     if resend_api_key and email_to:
-        notifier = EmailNotifier(resend_api_key, email_from, email_to)
-        if notifier.send_papers_sections(all_papers_sections):
-            success_count += 1
+        email_notifier = EmailNotifier(resend_api_key, email_from, email_to, deadline=send_deadline)
+    slack_notifier = SlackNotifier(webhook_url, deadline=send_deadline) if webhook_url else None
 
-    # Slack（最初のセクションのみ送信）
-    if webhook_url and all_papers_sections:
-        notifier = SlackNotifier(webhook_url)
-        if notifier.send_papers(all_papers_sections[0][1]):
-            success_count += 1
+    success_count, delivered_ids = deliver_sections(all_papers_sections, email_notifier, slack_notifier)
 
     if success_count > 0:
-        # 送信済みIDを記録して保存
-        for _, papers in all_papers_sections:
-            for paper in papers:
-                sent_store.mark_sent(paper.arxiv_id)
+        # 実際に送信できた論文のIDだけを記録して保存
+        for arxiv_id in delivered_ids:
+            sent_store.mark_sent(arxiv_id)
         sent_store.save()
+        if backfill:
+            if backfill_failed:
+                logger.warning(f"取得に失敗した日があります: {', '.join(map(str, backfill_failed))}"
+                               "（再実行すると取得済みの日は再利用し、失敗した日のみ再取得します）")
+            else:
+                backfill.clear()
         logger.info(f"完了しました（{success_count}件送信、全{total_papers}件）")
     else:
         logger.error("すべての送信に失敗しました")
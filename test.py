@@ -5,12 +5,28 @@
 
 import os
 import sys
-from datetime import datetime, timedelta
+import json
+import time
+import random
+import string
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 # プロジェクトルートをパスに追加
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from main import ArxivFetcher, SemanticScholarClient, LLMSummarizer, filter_papers
+from main import (
+    Paper, ArxivFetcher, SemanticScholarClient, LLMSummarizer, FullTextExtractor,
+    HashEmbeddingProvider, VectorStore, EmbeddingMatcher, BackfillRunner, filter_papers,
+    filter_by_keyword, _build_embedding_matcher,
+    Deadline, DeadlineExceeded, CircuitBreaker, CircuitOpenError, get_circuit_breaker, http_request,
+    deliver_sections, PaperRenderer
+)
 
 
 def test_fetch():
@@ -92,11 +108,474 @@ def test_summarize(papers):
     return papers
 
 
+def _build_pdf(pages):
+    """テキストのみのシンプルなPDFを生成"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = " ".join(f"({line}) Tj 0 -14 Td" for line in lines)
+        stream = f"BT /F1 12 Tf 72 720 Td {ops} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = "%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode("latin-1")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    """アクセスログを出さないHTTPハンドラ"""
+
+    def log_message(self, *args):
+        pass
+
+
+def test_fulltext():
+    """PDF本文抽出テスト（ローカルHTTPサーバーを使用、ネットワーク不要）"""
+    print("\n" + "=" * 50)
+    print("テスト5: PDF本文抽出")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serve_dir = os.path.join(tmp, "pdf")
+        cache_dir = os.path.join(tmp, "cache")
+        os.makedirs(serve_dir)
+        with open(os.path.join(serve_dir, "2601.00001.pdf"), "wb") as f:
+            f.write(_build_pdf([
+                ["Test Paper", "Abstract", "1 Introduction", "We study caching of PDFs."],
+                ["5 Conclusion", "Caching works well.", "References", "[1] Someone."],
+            ]))
+        with open(os.path.join(serve_dir, "2601.00002.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4\n" + b"0" * 4096)
+        with open(os.path.join(serve_dir, "2601.00003.pdf"), "wb") as f:
+            f.write(b"not a pdf")
+        # 2601.00004.pdf は存在しない（404）
+
+        handler = partial(_QuietHandler, directory=serve_dir)
+        server = HTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+
+        papers = [
+            Paper(title=f"Paper {i}", authors=(), summary="", published=datetime.now(),
+                  url="", pdf_url=f"{base}/2601.0000{i}.pdf", arxiv_id=f"2601.0000{i}")
+            for i in (1, 2, 3, 4)
+        ]
+
+        try:
+            extractor = FullTextExtractor(cache_dir=cache_dir, max_workers=2, max_bytes=2048)
+            if not extractor.enabled:
+                print("pypdfがインストールされていないためスキップ")
+                return
+
+            extracted = extractor.fetch_all(papers + papers)
+            print(f"\n抽出件数: {extracted}件（サイズ超過・解析エラー・404の3件はスキップ）")
+            assert extracted == 1
+            for arxiv_id in ("2601.00002", "2601.00003", "2601.00004"):
+                assert extractor.is_cached(arxiv_id) and extractor.get_text(arxiv_id) is None
+
+            sections = extractor.get_key_sections("2601.00001")
+            print(f"\n序論・結論:\n{sections}")
+            assert "caching of PDFs" in sections and "Caching works well." in sections
+            assert "Someone" not in sections
+
+            # 2回目はキャッシュから（ダウンロードしない）
+            assert extractor.fetch_all(papers) == 0
+            assert not any(name.endswith((".part", ".tmp")) for name in os.listdir(cache_dir))
+        finally:
+            server.shutdown()
+
+
+def test_embedding():
+    """埋め込みマッチングテスト（ハッシュ埋め込みを使用、ネットワーク不要）"""
+    print("\n" + "=" * 50)
+    print("テスト6: 埋め込みマッチング")
+    print("=" * 50)
+
+    class CountingProvider(HashEmbeddingProvider):
+        def __init__(self):
+            super().__init__()
+            self.embedded = 0
+
+        def embed(self, texts):
+            self.embedded += len(texts)
+            return super().embed(texts)
+
+    def make_paper(arxiv_id, title, summary):
+        return Paper(title=title, authors=(), summary=summary, published=datetime.now(),
+                     url="", pdf_url="", arxiv_id=arxiv_id)
+
+    papers = [
+        make_paper("2601.00001", "Retrieval augmented generation with long context", "retrieval augmented generation"),
+        make_paper("2601.00002", "Retrieval augmented generation with long context", "retrieval augmented generation"),
+        make_paper("2601.00003", "Retrieval for augmented generation pipelines", "dense retrieval generation"),
+        make_paper("2601.00004", "Robot locomotion policies", "legged robot control"),
+    ]
+    interests = {"RAG": "retrieval augmented generation", "Robot": "robot control"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        provider = CountingProvider()
+        matcher = EmbeddingMatcher(provider, VectorStore(tmp, provider.name))
+        if not matcher.enabled:
+            print("numpyがインストールされていないためスキップ")
+            return
+
+        ranked = matcher.rank_sections(papers, interests, top_k=3)
+        for name, picked in ranked.items():
+            print(f"{name}: {[p.arxiv_id for p in picked]}")
+
+        # 重複論文（00002）はクラスタで除外される
+        assert [p.arxiv_id for p in ranked["RAG"]] == ["2601.00001", "2601.00003"]
+        assert [p.arxiv_id for p in ranked["Robot"]] == ["2601.00004"]
+        assert provider.embedded == len(papers) + len(interests)
+
+        # しきい値未満しかないキーワードのセクションは空になる
+        strict = EmbeddingMatcher(provider, VectorStore(tmp, provider.name), min_score=0.99)
+        assert strict.rank_sections(papers, interests, top_k=3) == {"RAG": [], "Robot": []}
+
+        # 再読み込みしたキャッシュでは新しい論文のみ埋め込む
+        provider = CountingProvider()
+        matcher = EmbeddingMatcher(provider, VectorStore(tmp, provider.name))
+        matcher.rank_sections(papers + [make_paper("2601.00005", "Memory for agents", "agent memory")], interests)
+        print(f"\n2回目の埋め込み件数: {provider.embedded - len(interests)}件")
+        assert provider.embedded == 1 + len(interests)
+
+        # 行列ファイルが欠けている場合は作り直して全件を埋め込み直す
+        with open(os.path.join(tmp, "vectors.f32"), "r+b") as f:
+            f.truncate(100)
+        provider = CountingProvider()
+        store = VectorStore(tmp, provider.name)
+        assert len(store) == 0
+        assert EmbeddingMatcher(provider, store).rank_sections(papers, interests) is not None
+        assert provider.embedded == len(papers) + len(interests)
+
+        # 保持期間より前に使われたベクトルは読み込み時に削除して行列を詰め直す
+        expected = store.get(["2601.00002", "2601.00004"])
+        with open(os.path.join(tmp, "index.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        old_day = (datetime.now() - timedelta(days=31)).strftime("%Y-%m-%d")
+        meta["last_used"].update({"2601.00001": old_day, "2601.00003": old_day})
+        with open(os.path.join(tmp, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        store = VectorStore(tmp, provider.name, retention_days=30)
+        print(f"保持期間経過後の埋め込みキャッシュ: {len(store)}件")
+        assert len(store) == 2 and "2601.00001" not in store
+        assert os.path.getsize(os.path.join(tmp, "vectors.f32")) == 2 * store.dim * 4
+        assert (store.get(["2601.00002", "2601.00004"]) == expected).all()
+
+    # 実際の要約に近い長さ（150語程度）でも、無関係な論文はハッシュの衝突で選ばれない
+    rng = random.Random(0)
+    vocabulary = (
+        "we propose a novel method for large language models that improves performance on "
+        "standard benchmarks the results show our approach outperforms strong baselines in "
+        "accuracy and efficiency with fewer parameters training data evaluation tasks this "
+        "paper introduces framework based on transformer architecture attention layers and "
+        "experiments demonstrate significant gains across multiple datasets while reducing cost"
+    ).split()
+    # 論文ごとに異なる専門用語（ランダムな綴り）を混ぜて語彙を実際の要約に近づける
+    terms = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 9))) for _ in range(2000)]
+
+    def make_abstract():
+        return " ".join(rng.choice(terms) if rng.random() < 0.4 else rng.choice(vocabulary) for _ in range(150))
+
+    long_papers = [
+        make_paper(f"2602.{i:05d}", f"Study {i} of {' '.join(rng.sample(terms, 3))}", make_abstract())
+        for i in range(100)
+    ]
+    robot_papers = [
+        make_paper(f"2602.{100 + i:05d}", f"Robot {topic}", f"We study robot {topic}. {make_abstract()}")
+        for i, topic in enumerate(["manipulation", "navigation", "grasping"])
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        provider = HashEmbeddingProvider()
+        matcher = EmbeddingMatcher(provider, VectorStore(tmp, provider.name))
+        ranked = matcher.rank_sections(long_papers + robot_papers, {"Robot": "robot"}, top_k=10)
+        print(f"\n長い要約でのRobotセクション: {[p.arxiv_id for p in ranked['Robot']]}")
+        assert sorted(ranked["Robot"], key=lambda p: p.arxiv_id) == filter_by_keyword(long_papers + robot_papers, "robot")
+
+    # hash埋め込みは明示した場合のみ使い、OpenAIのキーがなければ文字列一致にフォールバックする
+    saved = {k: os.environ.pop(k, None) for k in ("EMBEDDING_PROVIDER", "OPENAI_API_KEY")}
+    try:
+        assert _build_embedding_matcher() is None
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ.update(EMBEDDING_PROVIDER="hash", EMBEDDING_CACHE_DIR=tmp)
+            assert isinstance(_build_embedding_matcher().provider, HashEmbeddingProvider)
+    finally:
+        for key in ("EMBEDDING_PROVIDER", "EMBEDDING_CACHE_DIR"):
+            os.environ.pop(key, None)
+        os.environ.update({k: v for k, v in saved.items() if v is not None})
+
+
+def test_backfill():
+    """バックフィルのチェックポイント・再開テスト（ネットワーク不要）"""
+    print("\n" + "=" * 50)
+    print("テスト7: バックフィル")
+    print("=" * 50)
+
+    calls = []
+    failing = {"2026-10-02"}
+
+    def fetch_day(day):
+        calls.append(day.isoformat())
+        if day.isoformat() in failing:
+            raise RuntimeError("temporary error")
+        return [
+            Paper(title=f"Paper {day}", authors=("A",), summary="", published=datetime(2026, 10, day.day),
+                  url="", pdf_url="", arxiv_id=f"2610.0000{day.day}", citation_count=day.day),
+            Paper(title="Shared", authors=(), summary="", published=datetime(2026, 10, 1),
+                  url="", pdf_url="", arxiv_id="2610.99999", citation_count=day.day * 10),
+        ]
+
+    start, end = datetime(2026, 10, 1).date(), datetime(2026, 10, 3).date()
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = BackfillRunner(fetch_day, "test", checkpoint_path=os.path.join(tmp, "checkpoint.json"))
+        papers, failed = runner.run(start, end)
+        print(f"\n1回目: {[p.arxiv_id for p in papers]} 失敗={failed}")
+        assert [str(d) for d in failed] == ["2026-10-02"]
+        assert papers[0].arxiv_id == "2610.99999" and papers[0].citation_count == 30
+
+        # 再実行では失敗した日だけを取得する
+        failing.clear()
+        calls.clear()
+        papers, failed = runner.run(start, end)
+        print(f"2回目: {[p.arxiv_id for p in papers]} 取得日={calls}")
+        assert calls == ["2026-10-02"] and not failed
+        assert len(papers) == 4 and papers[-1].authors == ("A",)
+
+        # 期間が変わっても（終了日を省略して翌日に再実行した場合など）期間内の取得済みの日は再利用する
+        calls.clear()
+        papers, failed = runner.run(start, end + timedelta(days=1))
+        print(f"期間延長: 取得日={calls}")
+        assert calls == ["2026-10-04"] and len(papers) == 5
+
+        # 対象日の当日に取得した日は、別の日の再実行では取り直す
+        checkpoint_path = os.path.join(tmp, "checkpoint.json")
+        with open(checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        checkpoint["fetched_on"]["2026-10-04"] = "2026-10-04"
+        with open(checkpoint_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        calls.clear()
+        runner.run(start, end + timedelta(days=1))
+        assert calls == ["2026-10-04"]
+
+    # arXivは複数スレッドから呼ばれても検索を同時に実行しない
+    class SerialCheckClient:
+        def __init__(self):
+            self.active = 0
+            self.max_active = 0
+
+        def results(self, search):
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            time.sleep(0.05)
+            self.active -= 1
+            return iter([])
+
+    fetcher = ArxivFetcher("cat:cs.AI")
+    fetcher.client = SerialCheckClient()
+    days = [start + timedelta(days=i) for i in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(fetcher.fetch_papers_for_date, days))
+    print(f"arXiv検索の最大同時実行数: {fetcher.client.max_active}")
+    assert fetcher.client.max_active == 1
+
+
+class _FlakyHandler(SimpleHTTPRequestHandler):
+    """/fail は500、/missing は404、/slow は応答を遅らせるハンドラ"""
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(2)
+        status = {"/fail": 500, "/missing": 404}.get(self.path, 200)
+        self.send_response(status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_deadline_and_circuit_breaker():
+    """実行期限とサーキットブレーカーのテスト（ローカルHTTPサーバーを使用）"""
+    print("\n" + "=" * 50)
+    print("テスト8: 実行期限・サーキットブレーカー")
+    print("=" * 50)
+
+    servers = [HTTPServer(("127.0.0.1", 0), _FlakyHandler) for _ in range(2)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    flaky, other = (f"http://127.0.0.1:{server.server_port}" for server in servers)
+
+    def outcome(url, deadline=None):
+        try:
+            http_request("GET", url, deadline, timeout=5)
+            return "ok"
+        except Exception as e:
+            return type(e).__name__
+
+    try:
+        # 4xxはホスト障害として数えない
+        results = [outcome(f"{flaky}/missing") for _ in range(3)] + [outcome(f"{flaky}/ok")]
+        print(f"\n404×3 → {results}")
+        assert results[-1] == "ok"
+
+        # 5xxが3回続くとブレーカーが開き、他のホストには影響しない
+        results = [outcome(f"{flaky}/fail") for _ in range(4)]
+        print(f"500×4 → {results}")
+        assert results[-1] == CircuitOpenError.__name__ and outcome(f"{flaky}/ok") == CircuitOpenError.__name__
+        assert outcome(f"{other}/ok") == "ok"
+
+        # タイムアウトは残り時間に切り詰められる
+        deadline = Deadline(0.5)
+        start = time.monotonic()
+        result = outcome(f"{other}/slow", deadline)
+        elapsed = time.monotonic() - start
+        print(f"期限0.5秒で/slow → {result}（{elapsed:.1f}秒）")
+        assert result != "ok" and elapsed < 1.5
+        assert outcome(f"{other}/ok", deadline) == DeadlineExceeded.__name__
+
+        # ステージ予算は送信用の予約分を残す
+        stage = Deadline(100).stage(0.9, reserve=0.15)
+        assert 84 < stage.remaining() <= 85
+    finally:
+        for server in servers:
+            server.shutdown()
+
+    # 半開状態では1回だけ試行を通し、結果が出るまで他の呼び出しは即座に失敗する
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.1)
+    breaker.record_failure()
+    time.sleep(0.15)
+    breaker.before_call()
+    try:
+        breaker.before_call()
+        assert False, "半開中の2回目の呼び出しが通ってしまいました"
+    except CircuitOpenError:
+        pass
+    breaker.record_failure()
+    time.sleep(0.15)
+    breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    breaker.before_call()
+    print("半開状態の試行は1回のみ")
+
+    # arXivの応答が止まった場合は打ち切り、それまでの結果を返す
+    class StalledClient:
+        def results(self, search):
+            for i in range(2):
+                yield SimpleNamespace(
+                    title=f"Paper {i}", authors=[SimpleNamespace(name="A")], summary="abstract",
+                    published=datetime.now(timezone.utc), entry_id=f"http://arxiv.org/abs/2610.0000{i}v1",
+                    pdf_url=f"http://arxiv.org/pdf/2610.0000{i}v1"
+                )
+            time.sleep(1)
+
+    fetcher = ArxivFetcher("cat:cs.AI", result_timeout=0.3)
+    fetcher.client = StalledClient()
+    start = time.monotonic()
+    papers = fetcher.fetch_papers(days_back=1)
+    elapsed = time.monotonic() - start
+    print(f"arXiv停止時: {len(papers)}件で打ち切り（{elapsed:.1f}秒）")
+    assert [p.arxiv_id for p in papers] == ["2610.00000v1", "2610.00001v1"] and elapsed < 0.8
+
+    # バックフィル用の取得は途中までの結果を返さずに失敗させる（その日は再取得される）
+    fetcher = ArxivFetcher("cat:cs.AI", result_timeout=0.3)
+    fetcher.client = StalledClient()
+    try:
+        fetcher.fetch_papers_for_date(datetime.now().date())
+        assert False, "停止したarXiv取得が例外になりませんでした"
+    except DeadlineExceeded:
+        pass
+    get_circuit_breaker(ArxivFetcher.HOST).record_success()
+
+    # 送信済みとして記録するのは実際に送信できた論文のみ
+    class StubEmail:
+        def __init__(self, ok):
+            self.ok = ok
+
+        def send_papers_sections(self, sections):
+            return self.ok
+
+    class StubSlack:
+        def send_papers(self, papers):
+            return True
+
+    def make_paper(arxiv_id):
+        return Paper(title=arxiv_id, authors=(), summary="", published=datetime.now(),
+                     url="", pdf_url="", arxiv_id=arxiv_id)
+
+    sections = [("人気Top10", [make_paper("2610.00001")]), ("RAG Top10", [make_paper("2610.00002")])]
+    assert deliver_sections(sections, StubEmail(False), StubSlack()) == (1, {"2610.00001"})
+    assert deliver_sections(sections, StubEmail(True), None) == (1, {"2610.00001", "2610.00002"})
+    assert deliver_sections(sections, StubEmail(False), None) == (0, set())
+    print("送信済みIDはSlackのみ成功時に最初のセクション分だけ記録")
+
+
+def test_render():
+    """Email HTML / Slack描画のテスト（エスケープと断片キャッシュ）"""
+    print("\n" + "=" * 50)
+    print("テスト9: 描画")
+    print("=" * 50)
+
+    paper = Paper(title="Costs < $5 & ${rank}", authors=("A", "B", "C", "D"), summary="abstract",
+                  published=datetime.now(), url="https://huggingface.co/papers/2601.00001",
+                  pdf_url="https://arxiv.org/pdf/2601.00001.pdf?a=1&b=2", arxiv_id="2601.00001",
+                  citation_count=3, ai_summary="summary <b>")
+    class CountingRenderer(PaperRenderer):
+        def __init__(self):
+            super().__init__()
+            self.builds = {"email": 0, "slack": 0}
+
+        def _build_email(self, paper):
+            self.builds["email"] += 1
+            return super()._build_email(paper)
+
+        def _build_slack(self, paper):
+            self.builds["slack"] += 1
+            return super()._build_slack(paper)
+
+    renderer = CountingRenderer()
+
+    html_content = renderer.email_document("title", [("RAG & Agents", [paper]), ("Top10", [paper])])
+    print(f"\n{renderer.email_paper(paper, 2)}")
+    assert "<h3>1. Costs &lt; $5 &amp; ${rank}</h3>" in html_content
+    assert "summary &lt;b&gt;" in html_content and "RAG &amp; Agents" in html_content
+    assert 'class="paper"' in html_content and 'style="' not in html_content
+
+    slack_text = renderer.slack_paper(paper, 3)
+    print(slack_text)
+    assert slack_text.startswith("*3. Costs &lt; $5 &amp; ${rank}*") and "_A、B、C他_" in slack_text
+
+    # 同じ論文は複数セクション・複数回の送信でも形式ごとに1回だけ描画される
+    renderer.email_document("title", [("Top10", [paper])])
+    renderer.slack_paper(paper, 1)
+    print(f"描画回数: {renderer.builds}")
+    assert renderer.builds == {"email": 1, "slack": 1}
+
+
 def main():
     """全テスト実行"""
     print("Paper Slack Bot テスト")
     print(f"時刻: {datetime.now().strftime('%Y/%m/%d %H:%M:%S')}")
 
+    # ネットワーク不要のテスト
+    test_fulltext()
+    test_embedding()
+    test_backfill()
+    test_deadline_and_circuit_breaker()
+    test_render()
+
     # .envチェック
     if not os.path.exists(".env"):
         print("\n⚠️  .envファイルがありません。.env.exampleをコピーして設定してください。")